@@ -1,11 +1,17 @@
 
 from typing import Any
 
-import feedparser
+import aiohttp
+import fastfeedparser
 from typing import List, Dict
 import requests
+from requests.adapters import HTTPAdapter
+from urllib3.util.retry import Retry
+import io
 import json
+import orjson
 import os
+import re
 import logging
 from datetime import datetime, timedelta, date
 import asyncio
@@ -14,11 +20,13 @@ import ssl
 import smtplib
 from email.mime.text import MIMEText
 from email.mime.multipart import MIMEMultipart
+from email.utils import formatdate
 
 import http.client, urllib.parse
 
 from newsdataapi import NewsDataApiClient
 from huggingface_summarizer import generate_summary_with_huggingface
+from summary_cache import get_cached_summary, store_summary
 
 
 from dotenv import load_dotenv
@@ -30,6 +38,21 @@ logging.basicConfig(
     format='%(asctime)s - %(levelname)s - %(message)s'
 )
 
+# Strips a leading ```html / ``` fence and a trailing ``` in one pass
+FENCE_RE = re.compile(r"^\s*```(?:html)?\s*|\s*```\s*$")
+
+# Strips HTML tags from feed/API descriptions before prompt assembly
+TAG_RE = re.compile(r"<[^>]+>")
+
+# Shared session so every API call reuses the same TLS connection pool
+# instead of paying a fresh TCP+TLS handshake per request
+SESSION = requests.Session()
+SESSION.mount("https://", HTTPAdapter(
+    pool_connections=8,
+    pool_maxsize=32,
+    max_retries=Retry(total=3, backoff_factor=0.3, status_forcelist=[429, 500, 502, 503, 504])
+))
+
 RSS_FEEDS = [
     "https://rss.nytimes.com/services/xml/rss/nyt/US.xml",
     "https://rss.nytimes.com/services/xml/rss/nyt/Technology.xml",
@@ -38,23 +61,97 @@ RSS_FEEDS = [
     "https://feeds.npr.org/1004/rss.xml"
 ]
 
+FEED_CACHE_PATH = "feed_cache.json"
+
+def load_feed_cache() -> Dict:
+    try:
+        with open(FEED_CACHE_PATH) as f:
+            return json.load(f)
+    except (OSError, ValueError):
+        return {}
+
+def save_feed_cache(cache: Dict):
+    try:
+        with open(FEED_CACHE_PATH, "w") as f:
+            json.dump(cache, f)
+    except OSError as e:
+        logging.warning(f"Could not save feed cache: {e}")
+
 async def fetch_news_from_raw_rss() -> List[Dict]:
     articles = []
+    feed_cache = load_feed_cache()
+
+    async def fetch_one(session, url):
+        # Conditional GET: the server answers 304 with no body if unchanged
+        cached = feed_cache.get(url, {})
+        # aiohttp advertises gzip/deflate and decompresses transparently;
+        # don't offer br here, decoding it needs the optional Brotli package
+        headers = {"User-Agent": "daily-news-emailer/1.0"}
+        if cached.get("etag"):
+            headers["If-None-Match"] = cached["etag"]
+        if cached.get("lm"):
+            headers["If-Modified-Since"] = cached["lm"]
+
+        async with session.get(url, headers=headers, timeout=aiohttp.ClientTimeout(total=15)) as response:
+            if response.status == 304:
+                return None
+            response.raise_for_status()
+            body = await response.read()
+            return body, response.headers.get("ETag", ""), response.headers.get("Last-Modified", "")
+
+    async def process_one(session, url):
+        result = await fetch_one(session, url)
+
+        if result is None:
+            # Not modified since last run: reuse the entries parsed then
+            cached_articles = feed_cache.get(url, {}).get("articles", [])
+            logging.info(f"Feed unchanged (304), reused {len(cached_articles)} cached articles")
+            return cached_articles
+
+        body, etag, last_modified = result
+
+        # Parse in a thread: lxml releases the GIL during tokenization, so
+        # parses kicked off here genuinely overlap across feeds. A malformed
+        # feed is logged and skipped rather than sinking the run.
+        try:
+            feed = await asyncio.to_thread(fastfeedparser.parse, body.decode("utf-8", "replace"))
+        except Exception as e:
+            logging.error(f"Skipping malformed feed {url}: {e}")
+            return []
+
+        if not feed.entries:
+            logging.warning(f"Feed {url} parsed but has no entries, skipping")
+            return []
+
+        feed_articles = []
+        for entry in feed.entries:
+            feed_articles.append({
+                "title": getattr(entry, "title", "Untitled"),
+                "description": getattr(entry, "summary", getattr(entry, "description", "")),
+                "url": getattr(entry, "link", ""),
+                "source": {"name": getattr(feed.feed, "title", "RSS Feed")},
+                "publishedAt": getattr(entry, "published", ""),
+                "author": getattr(entry, "author", "Unknown")
+            })
+
+        feed_cache[url] = {"etag": etag, "lm": last_modified, "articles": feed_articles}
+        logging.info("RSS request complete")
+        return feed_articles
 
-    try: 
-        for feed_url in RSS_FEEDS:
-            feed = feedparser.parse(feed_url)
-
-            for entry in feed.entries:
-                articles.append({
-                    "title": entry.get("title", "Untitled"),
-                    "description": entry.get("summary", entry.get("description", "")),
-                    "url": entry.get("link", ""),
-                    "source": {"name": feed.feed.get("title", "RSS Feed")},
-                    "publishedAt": entry.get("published", ""),
-                    "author": entry.get("author", "Unknown")
-                })
-            logging.info("RSS request complete")
+    try:
+        async with aiohttp.ClientSession() as session:
+            results = await asyncio.gather(
+                *(process_one(session, url) for url in RSS_FEEDS),
+                return_exceptions=True
+            )
+
+        for feed_url, result in zip(RSS_FEEDS, results):
+            if isinstance(result, Exception):
+                logging.error(f"Error fetching feed {feed_url}: {result}")
+                continue
+            articles.extend(result)
+
+        save_feed_cache(feed_cache)
     except Exception as e:
         logging.error(f"Error: RSS request incomplete: {e}")
     return articles
@@ -77,9 +174,20 @@ async def fetch_news_from_news_api() -> List[Dict]:
 
         logging.info(f"Fetching news from {len(link_list)} API endpoints...")
 
-        for i, url in enumerate(link_list, 1):
-            logging.info(f"[{i}/{len(link_list)}] Fetching from NewsData API...")
-            response = requests.get(url)
+        # Both endpoints are independent, so run the blocking GETs in
+        # threads and overlap the round-trips instead of paying them serially
+        async def fetch_endpoint(url):
+            return await asyncio.to_thread(SESSION.get, url, timeout=20)
+
+        responses = await asyncio.gather(
+            *(fetch_endpoint(url) for url in link_list),
+            return_exceptions=True
+        )
+
+        for i, response in enumerate(responses, 1):
+            if isinstance(response, Exception):
+                logging.error(f"Endpoint {i} failed: {response}")
+                continue
             data = response.json()
 
             # Check if request was successful
@@ -109,68 +217,109 @@ async def fetch_news_from_news_api() -> List[Dict]:
     
     return articles
 
-def generate_summary_with_claude(articles: List[Dict]) -> str:
-    
-    # Prepare articles with clear structure
-    articles_text = "\n\n".join([
-        f"Article {i+1}:\n"
-        f"Headline: {article['title']}\n"
-        f"Source: {article.get('source', {}).get('name', 'Unknown')}\n"
-        f"Summary: {article.get('description', 'No description available')}\n"
-        f"URL: {article.get('url', '')}\n"
-        f"Published: {article.get('publishedAt', 'Unknown date')}"
-        for i, article in enumerate(articles)
-    ])
-    
-    prompt = f"""Create a concise, engaging daily news summary email.
-
-            Articles:
-            {articles}
-
-            Format as an HTML email with:
-            1. No introduction or conclusion.
-            2. Keep the title emoji free  
-            3. Pick at most 15 key stories grouped by theme. Make no more than 4 themes. 
-            4. Make sure that politics and markets are discussed. 
-            4. For each story: headline, 2-4 sentence summary, link
-            5. Professional but friendly tone
-            
-            Keep under 500 words."""
-    
+def dedupe_articles(articles: List[Dict]) -> List[Dict]:
+    """Drop repeat stories so the LLM doesn't pay tokens to skip duplicates."""
+    seen = set()
+    unique = []
+    for article in articles:
+        # Normalize the URL (drop query/fragment) and pair it with the title
+        parts = urllib.parse.urlsplit(article.get("url", ""))
+        key = (parts.netloc + parts.path, article.get("title", "").strip().lower()[:80])
+        if key in seen:
+            continue
+        seen.add(key)
+        unique.append(article)
+    return unique
+
+def format_articles(articles: List[Dict], limit: int = 20) -> str:
+    """Render articles once so both summarizers share the same prompt text.
+
+    Descriptions are tag-stripped and capped at 240 chars: input tokens are
+    what the LLM bills for, and full article leads add little signal.
+    """
+    rendered = []
+    for i, article in enumerate(articles[:limit]):
+        description = TAG_RE.sub("", article.get("description", "") or "")[:240]
+        rendered.append(
+            f"Article {i+1}:\n"
+            f"Headline: {article['title']}\n"
+            f"Source: {article.get('source', {}).get('name', 'Unknown')}\n"
+            f"Summary: {description or 'No description available'}\n"
+            f"URL: {article.get('url', '')}\n"
+            f"Published: {article.get('publishedAt', 'Unknown date')}"
+        )
+    return "\n\n".join(rendered)
+
+# Stable instruction block for Claude, sent as the system prompt so only the
+# articles vary per run. Too short (~120 tokens) to qualify for Anthropic's
+# prompt cache, which needs a 2048-token prefix on Haiku models.
+CLAUDE_RULES = """Create a concise, engaging daily news summary email from the articles provided.
+
+Format as an HTML email with:
+1. No introduction or conclusion.
+2. Keep the title emoji free
+3. Pick at most 15 key stories grouped by theme. Make no more than 4 themes.
+4. Make sure that politics and markets are discussed.
+5. For each story: headline, 2-4 sentence summary, link
+6. Professional but friendly tone
+
+Keep under 500 words."""
+
+def generate_summary_with_claude(articles_text: str) -> str:
+
     try:
         api_key = os.environ.get("ANTHROPIC_API_KEY")
 
-        response = requests.post(
+        with SESSION.post(
             "https://api.anthropic.com/v1/messages",
             headers={
                 "x-api-key": api_key,
                 "Content-Type": "application/json",
-                "anthropic-version": "2023-06-01"
+                "anthropic-version": "2023-06-01",
+                "accept": "text/event-stream"
             },
-            json={
+            # orjson encodes/decodes in Rust, several times faster than stdlib json
+            data=orjson.dumps({
                 "model": "claude-haiku-4-5-20251001",
                 "max_tokens": 2000,
+                "stream": True,
+                "system": CLAUDE_RULES,
                 "messages": [{
-                    "role": "user", 
-                    "content": prompt
+                    "role": "user",
+                    "content": f"Articles:\n{articles_text}"
                 }]
-            },
-            timeout=30
-        )
-        response.raise_for_status()
-        result = response.json()
-
-        html_content = result["content"][0]["text"]
+            }),
+            stream=True,
+            timeout=(5, 60)
+        ) as response:
+            response.raise_for_status()
+
+            # Accumulate SSE text deltas as they arrive instead of waiting
+            # for the full 2000-token response to buffer server-side.
+            # Errors can arrive mid-stream after the 200 (e.g. overloaded),
+            # so treat anything short of message_stop as a failed run.
+            buffer = io.StringIO()
+            completed = False
+            for line in response.iter_lines():
+                if not line.startswith(b"data: "):
+                    continue
+                event = orjson.loads(line[len(b"data: "):])
+                event_type = event.get("type")
+                if event_type == "content_block_delta":
+                    buffer.write(event.get("delta", {}).get("text", ""))
+                elif event_type == "error":
+                    logging.error(f"Claude stream error: {event.get('error')}")
+                    return None
+                elif event_type == "message_stop":
+                    completed = True
+
+        html_content = buffer.getvalue()
+        if not completed or not html_content:
+            logging.error("Claude stream ended without message_stop; discarding partial output")
+            return None
 
         # Strip markdown code fences if present
-        if html_content.startswith("```html"):
-            html_content = html_content.replace("```html", "", 1)
-        if html_content.startswith("```"):
-            html_content = html_content.replace("```", "", 1)
-        if html_content.endswith("```"):
-            html_content = html_content.rsplit("```", 1)[0]
-
-        html_content = html_content.strip()
+        html_content = FENCE_RE.sub("", html_content).strip()
 
         logging.info("Summary generate successfully")
         return html_content
@@ -182,7 +331,7 @@ def send_email(subject: str, html_content: str):
     EMAIL_TO = os.environ.get("EMAIL_TO", "")
     EMAIL_FROM = os.environ.get("EMAIL_FROM", "")
     SMTP_SERVER = os.environ.get("SMTP_SERVER", "smtp.gmail.com")
-    SMTP_PORT = int(os.environ.get("SMTP_PORT", "587"))
+    SMTP_PORT = int(os.environ.get("SMTP_PORT", "465"))
     SMTP_PASSWORD = os.environ.get("SMTP_PASSWORD", "")
     
     try:
@@ -190,18 +339,25 @@ def send_email(subject: str, html_content: str):
         msg['Subject'] = subject
         msg['From'] = EMAIL_FROM
         msg['To'] = EMAIL_TO
-        msg['Date'] = str(datetime.now().strftime("%Y-%m-%d"))
+        msg['Date'] = formatdate(localtime=True)
 
         html_part = MIMEText(html_content, 'html')
         msg.attach(html_part)
 
+        # Implicit TLS on 465 saves the STARTTLS upgrade round-trip;
+        # any other port (587) still gets the STARTTLS handshake it expects
         context = ssl.create_default_context()
-        with smtplib.SMTP(SMTP_SERVER, SMTP_PORT) as server:
+        if SMTP_PORT == 465:
+            server = smtplib.SMTP_SSL(SMTP_SERVER, SMTP_PORT, context=context)
+        else:
+            server = smtplib.SMTP(SMTP_SERVER, SMTP_PORT)
             server.starttls(context=context)
+
+        with server:
             server.login(EMAIL_FROM, SMTP_PASSWORD)
-            server.sendmail(
-                EMAIL_FROM, EMAIL_TO, msg.as_string()
-            )
+            # send_message streams the MIME tree straight to the socket,
+            # skipping the full as_string() serialization in memory
+            server.send_message(msg)
         logging.info(f"Email sent successfully to {EMAIL_TO}")
         return True
     
@@ -211,18 +367,31 @@ def send_email(subject: str, html_content: str):
         
 
 async def main():
-    articles = await fetch_news_from_news_api()
-    summary = generate_summary_with_huggingface(articles)
+    articles = dedupe_articles(await fetch_news_from_news_api())
+
+    # Skip the LLM entirely if a recent run saw a near-identical article set
+    summary = get_cached_summary(articles)
+    if not summary:
+        # Render the article block once and share it across both summarizers
+        articles_text = format_articles(articles)
+        summary = generate_summary_with_huggingface(articles_text)
+
+        # Fallback to Claude if Hugging Face fails
+        if not summary or "Error" in summary:
+            logging.warning("Error in HF: Fall back on Claude")
+            summary = generate_summary_with_claude(articles_text)
 
-    # Fallback to Claude if Hugging Face fails
-    if not summary or "Error" in summary:
-        logging.warning("Error in HF: Fall back on Claude")
-        summary = generate_summary_with_claude(articles)
+        if summary:
+            store_summary(articles, summary)
 
     date = datetime.now().strftime("%d/%m/%Y")
     subject = f"Daily News for {date}"
     success = send_email(subject, summary)
 
 if __name__ == "__main__":
+    # libuv-based loop: ~2x the stdlib selector loop on socket-heavy work.
+    # Imported here so importing this module doesn't require uvloop.
+    import uvloop
+    uvloop.install()
     asyncio.run(main())
     
\ No newline at end of file
@@ -3,32 +3,26 @@ Hugging Face-based news summarizer (Free alternative to Claude)
 Uses models available on FREE Hugging Face Inference API
 """
 
+import importlib.util
 import os
+import re
 import requests
 import logging
 from typing import List, Dict
-from huggingface_hub import InferenceClient
-from openai import OpenAI
 
+# Heavy SDK imports (openai, transformers) stay inside the functions that
+# use them so the cron process doesn't pay their load time on startup.
 
+# Strips a leading ```html / ``` fence and a trailing ``` in one pass
+FENCE_RE = re.compile(r"^\s*```(?:html)?\s*|\s*```\s*$")
 
-def generate_summary_with_huggingface(articles: List[Dict]) -> str:
+def generate_summary_with_huggingface(articles_text: str) -> str:
     """Generate summary using Hugging Face Inference API (Free!)"""
 
-    # Prepare articles text
-    articles_text = "\n\n".join([
-        f"Article {i+1}:\n"
-        f"Title: {article['title']}\n"
-        f"Source: {article.get('source', {}).get('name', 'Unknown')}\n"
-        f"Description: {article.get('description', 'N/A')[:200]}\n"
-        f"URL: {article.get('url', '')}"
-        for i, article in enumerate(articles[:20])  # Limit to avoid context length
-    ])
-
     prompt = f"""Create a concise, engaging daily news summary email.
 
             Articles:
-            {articles}
+            {articles_text}
 
             Format as an HTML email with:
             1. No introduction or conclusion.
@@ -40,6 +34,12 @@ def generate_summary_with_huggingface(articles: List[Dict]) -> str:
             
             Keep under 500 words."""
 
+    if importlib.util.find_spec("openai") is None:
+        logging.error("openai library not installed. Install with: pip install openai")
+        return None
+
+    from openai import OpenAI
+
     try:
         client = OpenAI(
             base_url="https://router.huggingface.co/v1",
@@ -56,28 +56,12 @@ def generate_summary_with_huggingface(articles: List[Dict]) -> str:
         logging.info(f"Hugging Face response type: {type(html_content)}")
 
         # Strip markdown code fences if present
-        if html_content.startswith("```html"):
-            html_content = html_content.replace("```html", "", 1)
-        if html_content.startswith("```"):
-            html_content = html_content.replace("```", "", 1)
-        if html_content.endswith("```"):
-            html_content = html_content.rsplit("```", 1)[0]
-
-        html_content = html_content.strip()
+        html_content = FENCE_RE.sub("", html_content).strip()
 
         if not html_content:
-            logging.error(f"No content generated. Response: {html_content}")
-            return 
-
-        # Clean up markdown code fences if present
-        if html_content.startswith("```html"):
-            html_content = html_content.replace("```html", "", 1)
-        if html_content.startswith("```"):
-            html_content = html_content.replace("```", "", 1)
-        if html_content.endswith("```"):
-            html_content = html_content.rsplit("```", 1)[0]
-
-        html_content = html_content.strip()
+            # Log the raw response (html_content is empty by definition here)
+            logging.error(f"No content generated. Response: {response}")
+            return None
 
         logging.info("Summary generated successfully with Hugging Face")
         return html_content
@@ -85,10 +69,10 @@ def generate_summary_with_huggingface(articles: List[Dict]) -> str:
     except requests.exceptions.HTTPError as e:
         logging.error(f"HTTP Error calling Hugging Face: {e}")
         logging.error(f"Response: {e.response.text if e.response else 'No response'}")
-        return
+        return None
     except Exception as e:
         logging.error(f"Error calling Hugging Face: {e}")
-        return 
+        return None
 
 
 # Alternative: Using Hugging Face Transformers locally (slower in GitHub Actions)
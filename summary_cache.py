@@ -0,0 +1,97 @@
+"""
+Semantic cache for generated summary emails.
+
+Keys on an embedding of the day's article URL set rather than the full
+prompt, so prompt-wording tweaks still hit the cache. When the URL set is
+close enough to a recent run (cosine >= 0.92 within 12 hours) the stored
+HTML is returned and the paid LLM call is skipped entirely.
+
+Requires sentence-transformers (install with the "cache" extra); when it
+is missing the cache quietly disables itself and every call goes to the LLM.
+The same applies on ephemeral CI runners: unless summary_cache.db is
+persisted between runs (e.g. restored with actions/cache), every lookup
+misses and the cache is a no-op.
+"""
+
+import contextlib
+import json
+import logging
+import os
+import sqlite3
+import time
+from typing import Dict, List, Optional
+
+CACHE_DB = os.environ.get("SUMMARY_CACHE_DB", "summary_cache.db")
+EMBED_MODEL = "sentence-transformers/all-MiniLM-L6-v2"
+SIMILARITY_THRESHOLD = 0.92
+MAX_AGE_SECONDS = 12 * 60 * 60
+
+_model = None
+
+
+def _cache_key_text(articles: List[Dict]) -> str:
+    return "\n".join(sorted(a.get("url", "") for a in articles))
+
+
+def _embed(text: str) -> List[float]:
+    global _model
+    if _model is None:
+        from sentence_transformers import SentenceTransformer
+        _model = SentenceTransformer(EMBED_MODEL)
+    return [float(x) for x in _model.encode(text, normalize_embeddings=True)]
+
+
+def _connect() -> sqlite3.Connection:
+    conn = sqlite3.connect(CACHE_DB)
+    conn.execute(
+        "CREATE TABLE IF NOT EXISTS summaries (embedding TEXT, html TEXT, timestamp REAL)"
+    )
+    return conn
+
+
+def get_cached_summary(articles: List[Dict]) -> Optional[str]:
+    """Return a recent cached HTML summary for a near-identical article set, if any."""
+    try:
+        embedding = _embed(_cache_key_text(articles))
+        cutoff = time.time() - MAX_AGE_SECONDS
+
+        best_score = 0.0
+        best_html = None
+        with contextlib.closing(_connect()) as conn:
+            rows = conn.execute(
+                "SELECT embedding, html FROM summaries WHERE timestamp >= ?", (cutoff,)
+            )
+            for stored_embedding, html in rows:
+                stored = json.loads(stored_embedding)
+                # Embeddings are normalized, so the dot product is the cosine
+                score = sum(x * y for x, y in zip(embedding, stored))
+                if score > best_score:
+                    best_score = score
+                    best_html = html
+
+        if best_score >= SIMILARITY_THRESHOLD:
+            logging.info(f"Summary cache hit (cosine {best_score:.3f})")
+            return best_html
+
+    except Exception as e:
+        logging.warning(f"Summary cache lookup skipped: {e}")
+    return None
+
+
+def store_summary(articles: List[Dict], html: str):
+    """Store a freshly generated summary for future lookups."""
+    try:
+        embedding = _embed(_cache_key_text(articles))
+        with contextlib.closing(_connect()) as conn:
+            with conn:
+                # Prune rows past the TTL so the DB doesn't grow forever
+                conn.execute(
+                    "DELETE FROM summaries WHERE timestamp < ?",
+                    (time.time() - MAX_AGE_SECONDS,)
+                )
+                conn.execute(
+                    "INSERT INTO summaries VALUES (?, ?, ?)",
+                    (json.dumps(embedding), html, time.time())
+                )
+    except Exception as e:
+        logging.warning(f"Summary cache store skipped: {e}")